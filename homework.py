@@ -1,5 +1,6 @@
 import logging
 import os
+import random
 import sys
 import time
 from http import HTTPStatus
@@ -17,15 +18,21 @@ logger = logging.getLogger(__name__)
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
-TOKENS = (
-    'PRACTICUM_TOKEN',
-    'TELEGRAM_TOKEN',
-    'TELEGRAM_CHAT_ID',
-)
 
 RETRY_PERIOD = 600
+MAX_BACKOFF = 3600
+IDLE_POLLS_BEFORE_BACKOFF = 6
+BACKOFF_JITTER = 0.1
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+REQUEST_TIMEOUT = (5, 30)
+SERVER_FAILURE_KEYS = frozenset(('code', 'error'))
+TELEGRAM_MESSAGE_LIMIT = 4096
+MESSAGES_SEPARATOR = '\n\n'
+RETRY_AFTER_STATUSES = (
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+)
 
 STATUS_CHANGE = 'Изменился статус проверки работы "{}". {}'
 NO_DATA_AVAILABLES_CHANGE = ' Ключ {} отсутствует в данных {}.'
@@ -40,12 +47,20 @@ SERVER_FAILURES = (
 )
 
 API_RESPONSE_ERROR = 'Ответ API: {}, ожидается: {}.'
-ERROR_MESSAGE = 'Ошибка отправки сообщения в Telegram {}: {}'
-MESSAGE_SENT = 'Сообщение отправлено в Telegram: {}'
+ERROR_MESSAGE = 'Ошибка отправки сообщения в Telegram %s: %s'
+MESSAGE_SENT = 'Сообщение отправлено в Telegram: %s'
+TELEGRAM_FLOOD_WAIT = 'Telegram ограничил отправку, повтор через %s с.'
 NUL_LIST_ERROR = 'В ответе API получен пустой список домашних работ или None'
 PROGRAM_ERROR = 'Сбой в работе программы: {}'
 HOMEWORK_STATUS_ERROR = 'Некорректный статус домашки: {}'
 HOMEWORKS_NOT_RESPONSE = '{} отсутствует в ответе API.'
+STATUS_NOT_CHANGED = 'Статус работы "%s" не изменился: %s'
+HOMEWORK_PARSE_ERROR = 'Не удалось обработать домашнюю работу {}: {}'
+
+LOG_FORMAT = (
+    '%(asctime)s, %(levelname)s, %(name)s, '
+    '%(lineno)d, %(funcName)s, %(message)s'
+)
 
 
 HOMEWORK_VERDICTS = {
@@ -58,15 +73,25 @@ HOMEWORK_VERDICTS = {
 class APIError(Exception):
     """Исключение для ошиок сервера."""
 
+    def __init__(self, message, retry_after=None):
+        """Сохраняет паузу из заголовка Retry-After, если она передана."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
 
 def check_tokens():
     """Проверяет доступность переменных окружения."""
-    missings = [token for token in TOKENS if globals()[token] is None]
+    tokens = (
+        ('PRACTICUM_TOKEN', PRACTICUM_TOKEN),
+        ('TELEGRAM_TOKEN', TELEGRAM_TOKEN),
+        ('TELEGRAM_CHAT_ID', TELEGRAM_CHAT_ID),
+    )
+    missings = [name for name, value in tokens if value is None]
     if missings:
         message = (
             f'Отсутствуют необходимые переменные окружения: {missings}'
         )
-        logging.critical(message)
+        logger.critical(message)
         raise OSError(message)
 
 
@@ -75,36 +100,41 @@ def get_api_answer(timestamp):
     requests_pars = dict(
         url=ENDPOINT,
         headers=HEADERS,
-        params={'from_date': timestamp}
+        params={'from_date': timestamp},
+        timeout=REQUEST_TIMEOUT,
     )
     try:
         response = requests.get(**requests_pars)
     except requests.RequestException as e:
-        raise ConnectionError(API_REQUEST_ERROR.format(e, **requests_pars))
+        raise ConnectionError(
+            API_REQUEST_ERROR.format(e, requests_pars['params'])
+        )
 
-    if response.status_code != HTTPStatus.OK.value:
+    if response.status_code != HTTPStatus.OK:
+        retry_after = None
+        if response.status_code in RETRY_AFTER_STATUSES:
+            header = response.headers.get('Retry-After', '')
+            retry_after = int(header) if header.isdigit() else None
         raise APIError(
-            RESPONCE_STATUS_ERROR.format(response.status_code, **requests_pars)
+            RESPONCE_STATUS_ERROR.format(
+                response.status_code, requests_pars['params']
+            ),
+            retry_after=retry_after,
         )
 
     data = response.json()
-    for key in ('code', 'error'):
-        if key in data:
-            raise Exception(
-                SERVER_FAILURES.format(
-                    key,
-                    data[key],
-                    **requests_pars
-                )
-            )
+    failures = SERVER_FAILURE_KEYS.intersection(data)
+    if failures:
+        key = min(failures)
+        raise Exception(
+            SERVER_FAILURES.format(key, data[key], requests_pars['params'])
+        )
 
     return data
 
 
 def check_response(response):
-    """Проверяет ответ API на соответствие документации."""
-    if not response:
-        raise ValueError(NUL_LIST_ERROR)
+    """Проверяет ответ API и возвращает список домашних работ."""
     if not isinstance(response, dict):
         raise TypeError(
             API_RESPONSE_ERROR.format(type(response), dict)
@@ -118,6 +148,7 @@ def check_response(response):
         raise TypeError(
             API_RESPONSE_ERROR.format(type(homeworks), list)
         )
+    return homeworks
 
 
 def parse_status(homework):
@@ -127,67 +158,170 @@ def parse_status(homework):
             NO_DATA_AVAILABLES_CHANGE.format('status', 'homework')
         )
     status = homework['status']
-    if status not in HOMEWORK_VERDICTS:
+    verdict = HOMEWORK_VERDICTS.get(status)
+    if verdict is None:
         raise ValueError(HOMEWORK_STATUS_ERROR.format(status))
     if 'homework_name' not in homework:
         raise KeyError(NO_DATA_AVAILABLES_CHANGE.format(
             'homework_name', 'homework')
         )
-    return STATUS_CHANGE.format(
-        homework['homework_name'], HOMEWORK_VERDICTS[status]
-    )
+    return STATUS_CHANGE.format(homework['homework_name'], verdict)
+
+
+def get_status_changes(homeworks, last_statuses):
+    """Собирает пары (сообщение, новые статусы) по домашним работам.
+
+    Работа, которую не удалось разобрать, даёт сообщение об ошибке
+    без статусов и не мешает отправке остальных.
+    """
+    changes = []
+    for homework in homeworks:
+        try:
+            message = parse_status(homework)
+            name, status = homework['homework_name'], homework['status']
+            unchanged = last_statuses.get(name) == status
+        except (KeyError, TypeError, ValueError) as e:
+            message = HOMEWORK_PARSE_ERROR.format(homework, e)
+            logger.error(message)
+            changes.append((message, {}))
+            continue
+        if unchanged:
+            logger.debug(STATUS_NOT_CHANGED, name, status)
+            continue
+        changes.append((message, {name: status}))
+    return changes
+
+
+def split_messages(changes):
+    """Группирует сообщения в тексты не длиннее лимита Telegram."""
+    chunks = []
+    text, statuses = '', {}
+    for message, message_statuses in changes:
+        if text and (
+            len(text) + len(MESSAGES_SEPARATOR) + len(message)
+            > TELEGRAM_MESSAGE_LIMIT
+        ):
+            chunks.append((text, statuses))
+            text, statuses = '', {}
+        if text:
+            text += MESSAGES_SEPARATOR + message
+        else:
+            while len(message) > TELEGRAM_MESSAGE_LIMIT:
+                chunks.append((message[:TELEGRAM_MESSAGE_LIMIT], {}))
+                message = message[TELEGRAM_MESSAGE_LIMIT:]
+            text = message
+        statuses.update(message_statuses)
+    if text:
+        chunks.append((text, statuses))
+    return chunks
+
+
+def send_status_changes(bot, changes, last_statuses):
+    """Отправляет сообщения о статусах и запоминает доставленные."""
+    for text, statuses in split_messages(changes):
+        if not send_message(bot, text):
+            return False
+        last_statuses.update(statuses)
+    return True
 
 
 def send_message(bot, message):
     """Отправляет сообщение в Telegram-чат."""
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-        logging.debug(MESSAGE_SENT.format(message))
+        try:
+            bot.send_message(TELEGRAM_CHAT_ID, message)
+        except apihelper.ApiTelegramException as e:
+            if e.error_code != HTTPStatus.TOO_MANY_REQUESTS:
+                raise
+            retry_after = e.result_json.get(
+                'parameters', {}
+            ).get('retry_after', 1)
+            logger.warning(TELEGRAM_FLOOD_WAIT, retry_after)
+            time.sleep(retry_after)
+            bot.send_message(TELEGRAM_CHAT_ID, message)
+        logger.debug(MESSAGE_SENT, message)
         return True
     except apihelper.ApiException as e:
-        logging.error(ERROR_MESSAGE.format(message, e))
+        logger.error(ERROR_MESSAGE, message, e)
         return False
 
 
+def get_retry_delay(failures, retry_after=None):
+    """Вычисляет паузу перед следующим запросом после серии сбоев."""
+    delay = RETRY_PERIOD
+    if failures > 1:
+        delay = min(RETRY_PERIOD * 2 ** (failures - 1), MAX_BACKOFF)
+        delay *= random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def get_idle_delay(idle_polls):
+    """Увеличивает паузу между запросами, пока статусы не меняются."""
+    if idle_polls <= IDLE_POLLS_BEFORE_BACKOFF:
+        return RETRY_PERIOD
+    return min(
+        RETRY_PERIOD * 2 ** (idle_polls - IDLE_POLLS_BEFORE_BACKOFF),
+        MAX_BACKOFF
+    )
+
+
+def configure_logging():
+    """Настраивает логирование бота в файл и в stdout."""
+    if logger.handlers:
+        return
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in (
+        RotatingFileHandler(
+            f'{__file__}.log', maxBytes=5 * 1024 * 1024, backupCount=5
+        ),
+        logging.StreamHandler(stream=sys.stdout),
+    ):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+
+
 def main():
     """Основная логика работы бота."""
     check_tokens()
     bot = TeleBot(token=TELEGRAM_TOKEN)
     timestamp = int(time.time())
     last_message = None
+    last_statuses = {}
+    failures = 0
+    idle_polls = 0
 
     while True:
+        delay = RETRY_PERIOD
         try:
             response = get_api_answer(timestamp)
-            check_response(response)
-            homeworks = response['homeworks']
-            if not homeworks:
-                logging.debug(NUL_LIST_ERROR)
-                continue
-            message = parse_status(homeworks[0])
-            if send_message(bot, message):
+            homeworks = check_response(response)
+            if homeworks:
+                idle_polls = 0
+                changes = get_status_changes(homeworks, last_statuses)
+                if send_status_changes(bot, changes, last_statuses):
+                    timestamp = response.get('current_date', timestamp)
+            else:
+                logger.debug(NUL_LIST_ERROR)
                 timestamp = response.get('current_date', timestamp)
+                idle_polls += 1
+                delay = get_idle_delay(idle_polls)
+            failures = 0
         except Exception as e:
+            failures += 1
+            delay = get_retry_delay(failures, getattr(e, 'retry_after', None))
             message = PROGRAM_ERROR.format(e)
             if message != last_message and send_message(bot, message):
                 last_message = message
-            logging.error(message)
+            logger.exception(message)
 
         finally:
-            time.sleep(RETRY_PERIOD)
+            time.sleep(delay)
 
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format=(
-            '%(asctime)s, %(levelname)s, %(name)s, '
-            '%(lineno)d, %(funcName)s, %(message)s'
-        ),
-        handlers=[
-            RotatingFileHandler(f'{__file__}.log',
-                                maxBytes=5 * 1024 * 1024, backupCount=5),
-            logging.StreamHandler(stream=sys.stdout),
-        ],
-    )
+    configure_logging()
     main()
@@ -0,0 +1,191 @@
+import inspect
+import time
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import tests.check_utils as check_utils
+
+
+class MockResponseWithHeaders:
+    def __init__(self, http_status, headers=None):
+        self.status_code = http_status
+        self.headers = headers or {}
+
+    def json(self):
+        return {}
+
+
+@pytest.fixture
+def run_main(monkeypatch, homework_module):
+    """Run the unwrapped main() until it has slept `polls` times."""
+    monkeypatch.setattr(
+        homework_module, 'TeleBot', check_utils.MockTelegramBot
+    )
+    main = inspect.unwrap(homework_module.main)
+
+    def run(polls):
+        delays = []
+
+        def fake_sleep(secs):
+            delays.append(secs)
+            if len(delays) >= polls:
+                raise check_utils.BreakInfiniteLoop
+
+        monkeypatch.setattr(time, 'sleep', fake_sleep)
+        with pytest.raises(check_utils.BreakInfiniteLoop):
+            main()
+        return delays
+
+    return run
+
+
+class TestRetryDelay:
+    def test_first_failure_waits_retry_period(self, homework_module):
+        assert homework_module.get_retry_delay(1) == (
+            homework_module.RETRY_PERIOD
+        )
+
+    @pytest.mark.parametrize('failures', [2, 3])
+    def test_backoff_doubles_with_jitter(self, homework_module, failures):
+        base = homework_module.RETRY_PERIOD * 2 ** (failures - 1)
+        jitter = homework_module.BACKOFF_JITTER
+        delay = homework_module.get_retry_delay(failures)
+        assert base * (1 - jitter) <= delay <= base * (1 + jitter)
+
+    def test_backoff_is_capped(self, homework_module):
+        jitter = homework_module.BACKOFF_JITTER
+        delay = homework_module.get_retry_delay(50)
+        assert delay <= homework_module.MAX_BACKOFF * (1 + jitter)
+
+    def test_retry_after_is_lower_bound(self, homework_module):
+        assert homework_module.get_retry_delay(1, retry_after=5000) == 5000
+        assert homework_module.get_retry_delay(1, retry_after=10) == (
+            homework_module.RETRY_PERIOD
+        )
+
+
+class TestRetryAfterHeader:
+    @pytest.mark.parametrize('http_status', [
+        HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.SERVICE_UNAVAILABLE
+    ])
+    def test_retry_after_is_parsed(
+            self, monkeypatch, homework_module, http_status
+    ):
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: MockResponseWithHeaders(
+                http_status, {'Retry-After': '120'}
+            )
+        )
+        with pytest.raises(homework_module.APIError) as error:
+            homework_module.get_api_answer(0)
+        assert error.value.retry_after == 120
+
+    @pytest.mark.parametrize('http_status, headers', [
+        (HTTPStatus.TOO_MANY_REQUESTS, {}),
+        (HTTPStatus.TOO_MANY_REQUESTS,
+         {'Retry-After': 'Wed, 21 Oct 2026 07:28:00 GMT'}),
+        (HTTPStatus.INTERNAL_SERVER_ERROR, {'Retry-After': '120'}),
+    ])
+    def test_retry_after_is_ignored(
+            self, monkeypatch, homework_module, http_status, headers
+    ):
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: MockResponseWithHeaders(
+                http_status, headers
+            )
+        )
+        with pytest.raises(homework_module.APIError) as error:
+            homework_module.get_api_answer(0)
+        assert error.value.retry_after is None
+
+
+class TestMainFailures:
+    def test_transport_failures_back_off(
+            self, monkeypatch, homework_module, run_main
+    ):
+        def fail(timestamp):
+            raise ConnectionError('no route')
+
+        monkeypatch.setattr(homework_module, 'get_api_answer', fail)
+        delays = run_main(3)
+        assert delays[0] == homework_module.RETRY_PERIOD
+        assert delays[1] > delays[0] * 1.5
+        assert delays[2] > delays[1] * 1.5
+
+    def test_parse_failures_back_off(
+            self, monkeypatch, homework_module, run_main
+    ):
+        def fail_to_parse(homeworks, last_statuses):
+            raise ValueError('bad payload')
+
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda timestamp: {'homeworks': [{}], 'current_date': 1}
+        )
+        monkeypatch.setattr(
+            homework_module, 'get_status_changes', fail_to_parse
+        )
+        delays = run_main(3)
+        assert delays[0] == homework_module.RETRY_PERIOD
+        assert delays[1] > delays[0] * 1.5
+        assert delays[2] > delays[1] * 1.5
+
+    def test_success_resets_backoff(
+            self, monkeypatch, homework_module, run_main
+    ):
+        answers = iter([
+            ConnectionError('no route'),
+            ConnectionError('no route'),
+            {'homeworks': [], 'current_date': 1},
+            ConnectionError('no route'),
+        ])
+
+        def get_api_answer(timestamp):
+            answer = next(answers)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        monkeypatch.setattr(homework_module, 'get_api_answer', get_api_answer)
+        delays = run_main(4)
+        assert delays[2] == homework_module.RETRY_PERIOD
+        assert delays[3] == homework_module.RETRY_PERIOD
+
+
+class TestIdleDelay:
+    def test_idle_delay_series(self, homework_module):
+        grace = homework_module.IDLE_POLLS_BEFORE_BACKOFF
+        period = homework_module.RETRY_PERIOD
+        delays = [
+            homework_module.get_idle_delay(polls)
+            for polls in range(1, grace + 5)
+        ]
+        assert delays[:grace] == [period] * grace
+        assert delays[grace:] == [
+            min(period * 2 ** step, homework_module.MAX_BACKOFF)
+            for step in range(1, 5)
+        ]
+
+    def test_homework_resets_idle_delay(
+            self, monkeypatch, homework_module, run_main
+    ):
+        grace = homework_module.IDLE_POLLS_BEFORE_BACKOFF
+        quiet = {'homeworks': [], 'current_date': 1}
+        changed = {
+            'homeworks': [{'homework_name': 'a', 'status': 'approved'}],
+            'current_date': 2,
+        }
+        answers = iter([quiet] * (grace + 1) + [changed, quiet])
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda timestamp: next(answers)
+        )
+        delays = run_main(grace + 3)
+        period = homework_module.RETRY_PERIOD
+        assert delays[:grace] == [period] * grace
+        assert delays[grace] == period * 2
+        assert delays[grace + 1:] == [period, period]
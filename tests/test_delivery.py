@@ -0,0 +1,176 @@
+import inspect
+import time
+
+import pytest
+import telebot
+
+import tests.check_utils as check_utils
+
+
+class RecordingBot(check_utils.MockTelegramBot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append(text)
+
+
+@pytest.fixture
+def bot(monkeypatch, homework_module):
+    bot = RecordingBot()
+    monkeypatch.setattr(homework_module, 'TeleBot', lambda token: bot)
+    return bot
+
+
+@pytest.fixture
+def run_main(monkeypatch, homework_module):
+    """Run the unwrapped main() over the given API answers."""
+    def run(answers):
+        answers = iter(answers)
+        from_dates = []
+
+        def get_api_answer(timestamp):
+            from_dates.append(timestamp)
+            return next(answers)
+
+        def fake_sleep(secs):
+            if len(from_dates) >= 2:
+                raise check_utils.BreakInfiniteLoop
+
+        monkeypatch.setattr(homework_module, 'get_api_answer', get_api_answer)
+        monkeypatch.setattr(time, 'sleep', fake_sleep)
+        with pytest.raises(check_utils.BreakInfiniteLoop):
+            inspect.unwrap(homework_module.main)()
+        return from_dates
+
+    return run
+
+
+class TestStatusBatching:
+    def test_bad_homework_does_not_block_others(self, homework_module):
+        changes = homework_module.get_status_changes(
+            [
+                {'homework_name': 'a', 'status': 'approved'},
+                {'homework_name': 'b', 'status': 'weird'},
+                'not a homework',
+            ],
+            {}
+        )
+        assert changes[0] == (
+            homework_module.parse_status(
+                {'homework_name': 'a', 'status': 'approved'}
+            ),
+            {'a': 'approved'}
+        )
+        assert [statuses for _, statuses in changes[1:]] == [{}, {}]
+
+    def test_short_messages_share_one_text(self, homework_module):
+        chunks = homework_module.split_messages(
+            [('first', {'a': 'approved'}), ('second', {'b': 'rejected'})]
+        )
+        assert chunks == [
+            ('first\n\nsecond', {'a': 'approved', 'b': 'rejected'})
+        ]
+
+    def test_texts_fit_telegram_limit(self, homework_module):
+        limit = homework_module.TELEGRAM_MESSAGE_LIMIT
+        changes = [
+            ('x' * (limit // 3), {str(number): 'approved'})
+            for number in range(10)
+        ] + [('y' * (limit * 2 + 1), {'long': 'rejected'})]
+        chunks = homework_module.split_messages(changes)
+        assert all(len(text) <= limit for text, _ in chunks)
+        delivered = {}
+        for _, statuses in chunks:
+            delivered.update(statuses)
+        assert delivered == {
+            **{str(number): 'approved' for number in range(10)},
+            'long': 'rejected',
+        }
+        assert chunks[-1][1] == {'long': 'rejected'}
+
+    def test_main_delivers_valid_homeworks_and_advances(
+            self, homework_module, bot, run_main
+    ):
+        from_dates = run_main([
+            {
+                'homeworks': [
+                    {'homework_name': 'a', 'status': 'approved'},
+                    {'homework_name': 'b', 'status': 'weird'},
+                ],
+                'current_date': 100,
+            },
+            {'homeworks': [], 'current_date': 200},
+        ])
+        assert from_dates[1] == 100
+        assert homework_module.HOMEWORK_VERDICTS['approved'] in bot.sent[0]
+        assert 'weird' in bot.sent[0]
+
+
+class TestStatusDeduplication:
+    def test_unchanged_status_is_skipped(self, homework_module):
+        changes = homework_module.get_status_changes(
+            [
+                {'homework_name': 'a', 'status': 'approved'},
+                {'homework_name': 'b', 'status': 'approved'},
+            ],
+            {'a': 'approved', 'b': 'reviewing'}
+        )
+        assert [statuses for _, statuses in changes] == [{'b': 'approved'}]
+
+    def test_main_does_not_resend_known_status(
+            self, homework_module, bot, run_main
+    ):
+        homework = {'homework_name': 'a', 'status': 'approved'}
+        from_dates = run_main([
+            {'homeworks': [homework], 'current_date': 100},
+            {'homeworks': [homework], 'current_date': 200},
+        ])
+        assert len(bot.sent) == 1
+        assert from_dates == [from_dates[0], 100]
+
+
+def telegram_error(error_code, retry_after=None):
+    result_json = {'error_code': error_code, 'description': 'error'}
+    if retry_after is not None:
+        result_json['parameters'] = {'retry_after': retry_after}
+    return telebot.apihelper.ApiTelegramException(
+        'sendMessage', None, result_json
+    )
+
+
+class FailingBot(RecordingBot):
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = list(errors)
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        super().send_message(chat_id, text, **kwargs)
+
+
+class TestTelegramFloodWait:
+    @pytest.fixture
+    def sleeps(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr(time, 'sleep', sleeps.append)
+        return sleeps
+
+    def test_retry_after_429(self, homework_module, sleeps):
+        bot = FailingBot([telegram_error(429, retry_after=7)])
+        assert homework_module.send_message(bot, 'text') is True
+        assert sleeps == [7]
+        assert bot.sent == ['text']
+
+    def test_second_429_gives_up(self, homework_module, sleeps):
+        bot = FailingBot([telegram_error(429, 3), telegram_error(429, 3)])
+        assert homework_module.send_message(bot, 'text') is False
+        assert sleeps == [3]
+        assert bot.sent == []
+
+    def test_other_errors_are_not_retried(self, homework_module, sleeps):
+        bot = FailingBot([telegram_error(400)])
+        assert homework_module.send_message(bot, 'text') is False
+        assert sleeps == []